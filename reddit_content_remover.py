@@ -1,56 +1,135 @@
-import praw
+import asyncio
 import time
-from datetime import datetime
+import asyncpraw
+from aiolimiter import AsyncLimiter
 import os
+import sqlite3
+from dataclasses import dataclass, asdict
 from dotenv import load_dotenv
 import webbrowser
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
-from typing import Optional, Dict, Union
+from typing import Optional, Dict, Union, List, Set
 import sys
 
-class OAuthHandler(BaseHTTPRequestHandler):
-    def do_GET(self) -> None:
-        """Handle the OAuth2 callback from Reddit"""
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        
-        try:
-            # Extract code from callback URL
-            query_components = parse_qs(urlparse(self.path).query)
-            
-            if 'code' in query_components:
-                self.server.oauth_code = query_components['code'][0]
-                self.wfile.write(b"""
-                    <html>
-                        <body style='font-family: Arial, sans-serif; text-align: center; padding: 20px;'>
-                            <h2 style='color: #4CAF50;'>Authorization Successful!</h2>
-                            <p>You can close this window and return to the application.</p>
-                        </body>
-                    </html>
-                """)
-            else:
-                self.wfile.write(b"""
-                    <html>
-                        <body style='font-family: Arial, sans-serif; text-align: center; padding: 20px;'>
-                            <h2 style='color: #f44336;'>Authorization Failed!</h2>
-                            <p>Please try again or check the console for more information.</p>
-                        </body>
-                    </html>
-                """)
-        except Exception as e:
-            print(f"Error in OAuth callback: {str(e)}")
-            self.wfile.write(b"An error occurred during authorization.")
-        
-    def log_message(self, format: str, *args) -> None:
-        """Suppress default logging"""
+# Number of pending deletions fired together through asyncio.gather
+BATCH_SIZE = 20
+
+# Shared between posts and comments, sized to Reddit's 100 req/min OAuth budget
+rate_limiter = AsyncLimiter(100, 60)
+
+# Start waiting for the rate limit window to reset below this many remaining requests
+MIN_REMAINING_REQUESTS = 5
+
+# Format for item timestamps, which are rendered in UTC
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Flush stdout after this many item descriptions have been written
+FLUSH_INTERVAL = 50
+
+SEPARATOR = "-" * 50
+
+# Local record of deleted fullnames so interrupted runs can resume
+CACHE_PATH = os.path.expanduser('~/.reddit_content_remover.sqlite')
+
+# Commit the deletion cache after this many new rows
+CACHE_COMMIT_INTERVAL = 50
+
+# Seconds a recorded deletion is trusted; older items are retried if Reddit still lists them
+CACHE_TTL = 6 * 60 * 60
+
+# Seconds to wait for the browser to return with the authorization code
+OAUTH_TIMEOUT = 300
+
+# Seconds a callback connection may stay idle before its request line arrives
+OAUTH_READ_TIMEOUT = 10
+
+_OAUTH_OK_HTML: bytes = b"""
+    <html>
+        <body style='font-family: Arial, sans-serif; text-align: center; padding: 20px;'>
+            <h2 style='color: #4CAF50;'>Authorization Successful!</h2>
+            <p>You can close this window and return to the application.</p>
+        </body>
+    </html>
+"""
+
+_OAUTH_FAIL_HTML: bytes = b"""
+    <html>
+        <body style='font-family: Arial, sans-serif; text-align: center; padding: 20px;'>
+            <h2 style='color: #f44336;'>Authorization Failed!</h2>
+            <p>Please try again or check the console for more information.</p>
+        </body>
+    </html>
+"""
+
+_OAUTH_ERROR_HTML: bytes = b"An error occurred during authorization."
+
+def _http_response(body: bytes) -> bytes:
+    """Build a complete HTTP response so it can be sent in a single write"""
+    return (
+        b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % len(body)
+        + body
+    )
+
+_OAUTH_OK_RESPONSE = _http_response(_OAUTH_OK_HTML)
+_OAUTH_FAIL_RESPONSE = _http_response(_OAUTH_FAIL_HTML)
+_OAUTH_ERROR_RESPONSE = _http_response(_OAUTH_ERROR_HTML)
+
+async def handle_oauth_callback(received: asyncio.Future, connections: Set[asyncio.StreamWriter], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Handle the OAuth2 callback from Reddit"""
+    oauth_code = None
+    response = _OAUTH_ERROR_RESPONSE
+    
+    # Tracked so get_oauth_code can close idle connections once the code arrives
+    connections.add(writer)
+    try:
+        request_line = (await asyncio.wait_for(reader.readline(), timeout=OAUTH_READ_TIMEOUT)).decode('latin-1')
+    except (asyncio.TimeoutError, ConnectionError):
+        request_line = ''
+    except asyncio.CancelledError:
+        # Shutting down while the connection is still idle
+        writer.close()
+        return
+    finally:
+        connections.discard(writer)
+    
+    if not request_line:
+        # Idle or empty connections, such as browser preconnects, are not the callback
+        writer.close()
         return
+    
+    try:
+        # Extract code from the request line, e.g. "GET /?state=...&code=... HTTP/1.1"
+        query_components = parse_qs(urlparse(request_line.split(' ')[1]).query)
+        
+        if 'code' in query_components:
+            oauth_code = query_components['code'][0]
+            response = _OAUTH_OK_RESPONSE
+        else:
+            response = _OAUTH_FAIL_RESPONSE
+    except Exception as e:
+        print(f"Error in OAuth callback: {str(e)}")
+    
+    try:
+        writer.write(response)
+        await writer.drain()
+    finally:
+        writer.close()
+        # Only the first request is used
+        if not received.done():
+            received.set_result(oauth_code)
 
-def validate_env_vars() -> None:
-    """Validate that all required environment variables are set"""
+@dataclass(frozen=True, slots=True)
+class RedditCreds:
+    """Reddit API credentials read from the environment"""
+    client_id: str
+    client_secret: str
+    user_agent: str
+
+def validate_env_vars() -> RedditCreds:
+    """Validate that all required environment variables are set and return them"""
     required_vars = ['REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT']
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    values = {var: os.getenv(var) for var in required_vars}
+    missing_vars = [var for var, value in values.items() if not value]
     
     if missing_vars:
         print("Error: Missing required environment variables:")
@@ -58,218 +137,350 @@ def validate_env_vars() -> None:
             print(f"- {var}")
         print("\nPlease check your .env file and ensure all variables are set.")
         sys.exit(1)
+    
+    return RedditCreds(**{var.lower().removeprefix('reddit_'): value for var, value in values.items()})
 
-def get_oauth_code() -> Optional[str]:
+async def get_oauth_code() -> Optional[str]:
     """Start local server and get OAuth code"""
-    server = HTTPServer(('localhost', 8080), OAuthHandler)
-    server.oauth_code = None
+    received = asyncio.get_running_loop().create_future()
+    connections: Set[asyncio.StreamWriter] = set()
     
     try:
-        # Only handle one request
-        server.handle_request()
-        return server.oauth_code
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_oauth_callback(received, connections, reader, writer),
+            'localhost', 8080
+        )
+        async with server:
+            try:
+                return await asyncio.wait_for(received, timeout=OAUTH_TIMEOUT)
+            finally:
+                # Close idle connections such as browser preconnects so the server shuts down promptly
+                for writer in list(connections):
+                    writer.close()
+    except asyncio.TimeoutError:
+        print("Timed out waiting for authorization.")
+        return None
     except Exception as e:
         print(f"Error while getting OAuth code: {str(e)}")
         return None
-    finally:
-        server.server_close()
 
-def setup_reddit() -> praw.Reddit:
+async def setup_reddit() -> asyncpraw.Reddit:
     """
     Set up and return Reddit instance using OAuth2
     
     Returns:
-        praw.Reddit: Authenticated Reddit instance
+        asyncpraw.Reddit: Authenticated Reddit instance
     
     Raises:
         Exception: If authorization fails
     """
     load_dotenv()  # Load environment variables from .env file
-    validate_env_vars()
+    creds = validate_env_vars()
     
-    reddit = praw.Reddit(
-        client_id=os.getenv('REDDIT_CLIENT_ID'),
-        client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-        redirect_uri="http://localhost:8080",
-        user_agent=os.getenv('REDDIT_USER_AGENT')
+    reddit = asyncpraw.Reddit(
+        **asdict(creds),
+        redirect_uri="http://localhost:8080"
     )
     
-    # Generate the authorization URL
-    scopes = ['identity', 'history', 'edit']
-    auth_url = reddit.auth.url(scopes=scopes, state='uniquestate')
-    
-    print("\nPlease authorize the application:")
-    print(f"\n{auth_url}\n")
-    
-    # Open the authorization URL in default browser
     try:
-        webbrowser.open(auth_url)
-    except Exception as e:
-        print(f"Could not open browser automatically. Please copy and paste the URL manually: {auth_url}")
+        # Generate the authorization URL
+        scopes = ['identity', 'history', 'edit']
+        auth_url = reddit.auth.url(scopes=scopes, state='uniquestate')
+        
+        print("\nPlease authorize the application:")
+        print(f"\n{auth_url}\n")
+        
+        # Open the authorization URL in default browser
+        try:
+            webbrowser.open(auth_url)
+        except Exception as e:
+            print(f"Could not open browser automatically. Please copy and paste the URL manually: {auth_url}")
+        
+        # Wait for the callback
+        print("Waiting for authorization...")
+        oauth_code = await get_oauth_code()
+        
+        if not oauth_code:
+            raise Exception("Failed to get authorization code")
+        
+        try:
+            # Exchange the code for a refresh token
+            refresh_token = await reddit.auth.authorize(oauth_code)
+        except Exception as e:
+            raise Exception(f"Failed to authorize with Reddit: {str(e)}")
+        
+        print("\nAuthorization successful!")
+        return reddit
+    except BaseException:
+        # Close the session on any failure, including Ctrl-C while waiting for the callback
+        await reddit.close()
+        raise
+
+def open_cache(path: str = CACHE_PATH) -> sqlite3.Connection:
+    """Open the local deletion cache, creating its table if needed and pruning expired rows"""
+    cache = sqlite3.connect(path)
+    cache.execute("CREATE TABLE IF NOT EXISTS deleted(fullname TEXT PRIMARY KEY, ts INTEGER)")
+    cache.execute("DELETE FROM deleted WHERE ts < ?", (int(time.time()) - CACHE_TTL,))
+    cache.commit()
+    return cache
+
+def _is_deleted(cache: sqlite3.Connection, fullname: str) -> bool:
+    """Check whether an item was deleted by a recent run, within CACHE_TTL"""
+    return cache.execute(
+        "SELECT 1 FROM deleted WHERE fullname=? AND ts >= ?",
+        (fullname, int(time.time()) - CACHE_TTL)
+    ).fetchone() is not None
+
+def _record_deleted(cache: sqlite3.Connection, fullname: str) -> None:
+    """Record a successful deletion, committing every CACHE_COMMIT_INTERVAL changes"""
+    cache.execute("INSERT OR REPLACE INTO deleted(fullname, ts) VALUES (?, ?)", (fullname, int(time.time())))
+    if cache.total_changes % CACHE_COMMIT_INTERVAL == 0:
+        cache.commit()
+
+async def _throttle(reddit: asyncpraw.Reddit) -> None:
+    """Sleep until the rate limit window resets if Reddit reports it is nearly used up"""
+    limits = reddit.auth.limits
+    remaining, reset = limits['remaining'], limits['reset_timestamp']
+    
+    # Limits are unknown until the first response has been received
+    if remaining is None or reset is None or remaining > MIN_REMAINING_REQUESTS:
+        return
     
-    # Wait for the callback
-    print("Waiting for authorization...")
-    oauth_code = get_oauth_code()
+    await asyncio.sleep(max(0, reset - time.time()))
+
+async def _delete(reddit: asyncpraw.Reddit, cache: sqlite3.Connection, fullname: str) -> None:
+    """Delete a single submission or comment by fullname within the shared rate limit"""
+    async with rate_limiter:
+        await reddit.post('/api/del', data={'id': fullname})
+        _record_deleted(cache, fullname)
+        await _throttle(reddit)
+
+async def _flush(batch: List[asyncio.Task], kind: str) -> int:
+    """
+    Wait for a batch of pending deletions to finish
     
-    if not oauth_code:
-        raise Exception("Failed to get authorization code")
+    Args:
+        batch: pending deletion tasks
+        kind: "post" or "comment", used in error messages
     
-    try:
-        # Exchange the code for a refresh token
-        refresh_token = reddit.auth.authorize(oauth_code)
-        print("\nAuthorization successful!")
-        return reddit
-    except Exception as e:
-        raise Exception(f"Failed to authorize with Reddit: {str(e)}")
+    Returns:
+        int: Number of items successfully deleted
+    """
+    deleted_count = 0
+    for result in await asyncio.gather(*batch, return_exceptions=True):
+        if isinstance(result, BaseException):
+            print(f"Error deleting {kind}: {str(result)}")
+        else:
+            deleted_count += 1
+    return deleted_count
+
+def _count_finished(batch: List[asyncio.Task]) -> int:
+    """Count deletions in a batch that already succeeded, for when the batch is interrupted"""
+    return sum(1 for task in batch if task.done() and not task.cancelled() and task.exception() is None)
 
-def delete_all_posts(reddit: praw.Reddit, limit: Optional[int] = None) -> int:
+async def delete_all_posts(reddit: asyncpraw.Reddit, user: asyncpraw.models.Redditor, cache: sqlite3.Connection, limit: Optional[int] = None) -> int:
     """
     Delete all posts from the authenticated user's account
     
     Args:
-        reddit: authenticated praw.Reddit instance
+        reddit: authenticated asyncpraw.Reddit instance
+        user: the authenticated user's Redditor
+        cache: deletion cache opened with open_cache
         limit: maximum number of posts to delete (None for all posts)
     
     Returns:
         int: Number of posts deleted
     """
-    user = reddit.user.me()
     deleted_count = 0
+    queued_count = 0
+    skipped_count = 0
+    batch: List[asyncio.Task] = []
     
     print(f"\nStarting post deletion process for user: {user.name}")
     
     try:
         # Get all submissions by the user
-        for submission in user.submissions.new(limit=limit):
-            try:
-                # Print post information
-                print(f"Deleting post: {submission.title}")
-                print(f"Posted on: {datetime.fromtimestamp(submission.created_utc)}")
-                print(f"Score: {submission.score}")
-                print("-" * 50)
-                
-                # Delete the submission
-                submission.delete()
-                deleted_count += 1
-                
-                # Sleep to avoid hitting rate limits
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"Error deleting post: {str(e)}")
+        async for submission in user.submissions.new(limit=limit, params={'sr_detail': False}):
+            # Skip items already deleted by a previous run
+            if _is_deleted(cache, submission.fullname):
+                skipped_count += 1
                 continue
-    except KeyboardInterrupt:
+            
+            # Print post information in a single write
+            sys.stdout.write(
+                f"Deleting post: {submission.title}\n"
+                f"Posted on: {time.strftime(TIME_FORMAT, time.gmtime(submission.created_utc))} UTC\n"
+                f"Score: {submission.score}\n"
+                f"{SEPARATOR}\n"
+            )
+            queued_count += 1
+            if queued_count % FLUSH_INTERVAL == 0:
+                sys.stdout.flush()
+            
+            # Queue the deletion and flush once the batch is full
+            batch.append(asyncio.create_task(_delete(reddit, cache, submission.fullname)))
+            if len(batch) >= BATCH_SIZE:
+                deleted_count += await _flush(batch, "post")
+                batch = []
+        
+        deleted_count += await _flush(batch, "post")
+    except asyncio.CancelledError:
+        # Keep deletions that finished before the interrupt, then cancel the rest
+        deleted_count += _count_finished(batch)
+        for task in batch:
+            task.cancel()
         print("\nDeletion interrupted by user.")
     except Exception as e:
         print(f"Error fetching posts: {str(e)}")
+        deleted_count += await _flush(batch, "post")
     
     print(f"\nPost deletion complete! Deleted {deleted_count} posts.")
+    if skipped_count:
+        print(f"Skipped {skipped_count} posts already deleted by a previous run.")
     return deleted_count
 
-def delete_all_comments(reddit: praw.Reddit, limit: Optional[int] = None) -> int:
+async def delete_all_comments(reddit: asyncpraw.Reddit, user: asyncpraw.models.Redditor, cache: sqlite3.Connection, limit: Optional[int] = None) -> int:
     """
     Delete all comments from the authenticated user's account
     
     Args:
-        reddit: authenticated praw.Reddit instance
+        reddit: authenticated asyncpraw.Reddit instance
+        user: the authenticated user's Redditor
+        cache: deletion cache opened with open_cache
         limit: maximum number of comments to delete (None for all comments)
     
     Returns:
         int: Number of comments deleted
     """
-    user = reddit.user.me()
     deleted_count = 0
+    queued_count = 0
+    skipped_count = 0
+    batch: List[asyncio.Task] = []
     
     print(f"\nStarting comment deletion process for user: {user.name}")
     
     try:
         # Get all comments by the user
-        for comment in user.comments.new(limit=limit):
-            try:
-                # Print comment information
-                preview = comment.body[:100] + "..." if len(comment.body) > 100 else comment.body
-                print(f"Deleting comment: {preview}")
-                print(f"Posted on: {datetime.fromtimestamp(comment.created_utc)}")
-                print(f"Score: {comment.score}")
-                print("-" * 50)
-                
-                # Delete the comment
-                comment.delete()
-                deleted_count += 1
-                
-                # Sleep to avoid hitting rate limits
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"Error deleting comment: {str(e)}")
+        async for comment in user.comments.new(limit=limit, params={'sr_detail': False}):
+            # Skip items already deleted by a previous run
+            if _is_deleted(cache, comment.fullname):
+                skipped_count += 1
                 continue
-    except KeyboardInterrupt:
+            
+            # Print comment information in a single write
+            preview = comment.body[:100] + "..." if len(comment.body) > 100 else comment.body
+            sys.stdout.write(
+                f"Deleting comment: {preview}\n"
+                f"Posted on: {time.strftime(TIME_FORMAT, time.gmtime(comment.created_utc))} UTC\n"
+                f"Score: {comment.score}\n"
+                f"{SEPARATOR}\n"
+            )
+            queued_count += 1
+            if queued_count % FLUSH_INTERVAL == 0:
+                sys.stdout.flush()
+            
+            # Queue the deletion and flush once the batch is full
+            batch.append(asyncio.create_task(_delete(reddit, cache, comment.fullname)))
+            if len(batch) >= BATCH_SIZE:
+                deleted_count += await _flush(batch, "comment")
+                batch = []
+        
+        deleted_count += await _flush(batch, "comment")
+    except asyncio.CancelledError:
+        # Keep deletions that finished before the interrupt, then cancel the rest
+        deleted_count += _count_finished(batch)
+        for task in batch:
+            task.cancel()
         print("\nDeletion interrupted by user.")
     except Exception as e:
         print(f"Error fetching comments: {str(e)}")
+        deleted_count += await _flush(batch, "comment")
     
     print(f"\nComment deletion complete! Deleted {deleted_count} comments.")
+    if skipped_count:
+        print(f"Skipped {skipped_count} comments already deleted by a previous run.")
     return deleted_count
 
-def main() -> None:
+def _task_count(task: asyncio.Task) -> int:
+    """Return a deletion task's count, treating a task cancelled before it started as zero"""
+    return 0 if task.cancelled() else task.result()
+
+async def run_deletions(reddit: asyncpraw.Reddit, user: asyncpraw.models.Redditor, choice: str) -> None:
+    """
+    Run the selected deletions concurrently and print a summary
+    
+    Args:
+        reddit: authenticated asyncpraw.Reddit instance
+        user: the authenticated user's Redditor
+        choice: menu choice, '1' for posts, '2' for comments, '3' for both
+    """
+    cache = open_cache()
+    
     try:
-        # Set up Reddit instance
-        reddit = setup_reddit()
-        username = reddit.user.me().name
-        
-        # Ask what to delete
-        print("\nWhat would you like to delete?")
-        print("1. Posts only")
-        print("2. Comments only")
-        print("3. Both posts and comments")
-        choice = input("Enter your choice (1/2/3): ").strip()
-        
-        if choice not in ['1', '2', '3']:
-            print("Invalid choice. Exiting.")
-            return
-        
-        # Confirm before deletion
-        what_to_delete = {
-            '1': "posts",
-            '2': "comments",
-            '3': "posts and comments"
-        }[choice]
-        
-        confirm = input(f"\nThis will delete ALL {what_to_delete} for user {username}. Are you sure? (yes/no): ").strip().lower()
-        
-        if confirm != 'yes':
-            print("Deletion cancelled.")
-            return
-        
-        posts_deleted = 0
-        comments_deleted = 0
+        posts_task = asyncio.create_task(delete_all_posts(reddit, user, cache)) if choice in ['1', '3'] else None
+        comments_task = asyncio.create_task(delete_all_comments(reddit, user, cache)) if choice in ['2', '3'] else None
+        tasks = [task for task in (posts_task, comments_task) if task is not None]
         
         try:
-            # Perform deletions based on choice
-            if choice in ['1', '3']:
-                posts_deleted = delete_all_posts(reddit)
-            
-            if choice in ['2', '3']:
-                comments_deleted = delete_all_comments(reddit)
-            
-            # Print final summary
+            await asyncio.gather(*tasks)
             print("\nDeletion Summary:")
-            if choice in ['1', '3']:
-                print(f"Posts deleted: {posts_deleted}")
-            if choice in ['2', '3']:
-                print(f"Comments deleted: {comments_deleted}")
-            
-        except KeyboardInterrupt:
+        except asyncio.CancelledError:
+            # Each deletion task reports its own partial count when cancelled
             print("\n\nOperation cancelled by user.")
             print("Partial Deletion Summary:")
-            if choice in ['1', '3']:
-                print(f"Posts deleted: {posts_deleted}")
-            if choice in ['2', '3']:
-                print(f"Comments deleted: {comments_deleted}")
         
+        # Print final summary
+        if posts_task is not None:
+            print(f"Posts deleted: {_task_count(posts_task)}")
+        if comments_task is not None:
+            print(f"Comments deleted: {_task_count(comments_task)}")
+    finally:
+        cache.commit()
+        cache.close()
+
+def main() -> None:
+    try:
+        # Prompts run between event loop calls so Ctrl-C raises KeyboardInterrupt as usual
+        with asyncio.Runner() as runner:
+            # Set up Reddit instance
+            reddit = runner.run(setup_reddit())
+            
+            try:
+                # Fetch the authenticated user once and share it with both deletion tasks
+                user = runner.run(reddit.user.me())
+                
+                # Ask what to delete
+                print("\nWhat would you like to delete?")
+                print("1. Posts only")
+                print("2. Comments only")
+                print("3. Both posts and comments")
+                choice = input("Enter your choice (1/2/3): ").strip()
+                
+                if choice not in ['1', '2', '3']:
+                    print("Invalid choice. Exiting.")
+                    return
+                
+                # Confirm before deletion
+                what_to_delete = {
+                    '1': "posts",
+                    '2': "comments",
+                    '3': "posts and comments"
+                }[choice]
+                
+                confirm = input(f"\nThis will delete ALL {what_to_delete} for user {user.name}. Are you sure? (yes/no): ").strip().lower()
+                
+                if confirm != 'yes':
+                    print("Deletion cancelled.")
+                    return
+                
+                runner.run(run_deletions(reddit, user, choice))
+            finally:
+                runner.run(reddit.close())
+    except KeyboardInterrupt:
+        print("\n\nOperation cancelled by user.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file